@@ -0,0 +1,79 @@
+"""Startup benchmark: time from spawning uvicorn to the first answered request.
+
+    python bench_startup.py [--runs 5] [--path /api/health]
+
+Each run starts a fresh `uvicorn server:app` on a free port, polls until the
+health endpoint answers, then keeps polling /api/ready to report when warm-up
+has finished. A throwaway DB is used so the schema check runs every time
+unless --db points at an existing file.
+"""
+import argparse, os, socket, statistics, subprocess, sys, tempfile, time
+import urllib.error, urllib.request
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def poll(url: str, deadline: float, want_ok: bool = True) -> bool:
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=0.5) as r:
+                if not want_ok or r.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    return False
+
+def run_once(path: str, db: str, timeout: float) -> tuple:
+    """Returns (first response, ready) in seconds; ready is None if /api/ready never answered 200."""
+    port = free_port()
+    env = dict(os.environ, DB_PATH=db)
+    env.setdefault("OPENAI_API_KEY", "bench-placeholder")
+    t0 = time.monotonic()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        if not poll(base + path, t0 + timeout):
+            raise RuntimeError(f"{path} did not answer within {timeout}s")
+        first = time.monotonic() - t0
+        ready = time.monotonic() - t0 if poll(base + "/api/ready", t0 + timeout) else None
+        return first, ready
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--path", default="/api/health")
+    ap.add_argument("--db", default=None, help="reuse this DB file instead of a fresh one per run")
+    ap.add_argument("--timeout", type=float, default=30.0)
+    args = ap.parse_args()
+
+    firsts, readies = [], []
+    for i in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = args.db or os.path.join(tmp, "bench.db")
+            first, ready = run_once(args.path, db, args.timeout)
+        firsts.append(first)
+        if ready is None:
+            print(f"run {i+1}: first request {first*1000:.0f} ms, never ready within {args.timeout:.0f}s")
+        else:
+            readies.append(ready)
+            print(f"run {i+1}: first request {first*1000:.0f} ms, ready {ready*1000:.0f} ms")
+
+    print(f"median first request {statistics.median(firsts)*1000:.0f} ms over {args.runs} runs")
+    if readies:
+        print(f"median ready {statistics.median(readies)*1000:.0f} ms over {len(readies)} runs")
+    missed = args.runs - len(readies)
+    if missed:
+        print(f"{missed}/{args.runs} runs never reached ready", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
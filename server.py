@@ -1,13 +1,30 @@
-import os, re, json, sqlite3, uuid
+import os, re, io, json, gzip, hashlib, hmac, logging, mimetypes, posixpath, sqlite3, threading, time, uuid
+from contextlib import asynccontextmanager
+from collections import Counter
 from datetime import datetime
-from typing import List, Literal, Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Literal, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from openai import OpenAI
+
+if TYPE_CHECKING:
+    from openai import OpenAI   # imported in get_client(); the SDK is slow to import
+
+# optional: brotli variants and resized/WebP images; plain gzip/JPEG without them
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
 # ------------ Env & OpenAI ------------
 load_dotenv()
@@ -21,14 +38,89 @@ SOS_RESOURCES_URL = os.getenv(
     "SOS_RESOURCES_URL",
     "https://www.healthhub.sg/well-being-and-lifestyle/mental-wellness/mental-wellbeing"
 )
+ADMIN_TOKEN     = os.getenv("ADMIN_TOKEN")   # /api/admin/* is disabled unless set
 
 if not OPENAI_API_KEY:
     raise RuntimeError("Missing OPENAI_API_KEY in .env")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
+
+# ------------ Lazy singletons ------------
+# Nothing expensive happens at import: the OpenAI client, the SQLite
+# connection (plus schema check) and the static asset table are built on
+# first use. The lifespan hook warms them in a background thread so the
+# server starts accepting connections immediately; /api/ready reports when
+# every component is up and re-runs the warm-up if an earlier attempt failed.
+_client_lock, _conn_lock, _assets_lock = threading.Lock(), threading.Lock(), threading.Lock()
+_client: Optional["OpenAI"] = None
+_conn: Optional[sqlite3.Connection] = None
+_assets: Optional[dict] = None
+_warmup = {"running": False, "seconds": None}
+_warmup_lock = threading.Lock()
+STARTED_AT = time.monotonic()
+
+def get_client() -> "OpenAI":
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=OPENAI_API_KEY)
+    return _client
+
+def get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        with _conn_lock:
+            if _conn is None:
+                c = sqlite3.connect(DB_PATH, check_same_thread=False)
+                c.row_factory = sqlite3.Row
+                init_db(c)
+                _conn = c
+    return _conn
+
+def get_assets() -> dict:
+    global _assets
+    if _assets is None:
+        with _assets_lock:
+            if _assets is None:
+                _assets = build_asset_table()
+    return _assets
+
+def warm_up():
+    t0 = time.monotonic()
+    for name, build in (
+        ("database", get_conn),
+        ("assets", get_assets),
+        ("patterns", lambda: (_crisis_rx(), _negative_rx())),
+        ("openaiClient", get_client),
+    ):
+        try:
+            build()
+        except Exception:
+            logger.exception("warm-up of %s failed", name)
+    _warmup["seconds"] = round(time.monotonic() - t0, 3)
+    _warmup["running"] = False
+
+def start_warm_up():
+    with _warmup_lock:
+        if _warmup["running"]:
+            return
+        _warmup["running"] = True
+    threading.Thread(target=warm_up, name="xovia-warmup", daemon=True).start()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_warm_up()
+    yield
+    global _conn
+    with _conn_lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
 
 # ------------ FastAPI ------------
-app = FastAPI(title="XOVIA Backend")
+app = FastAPI(title="XOVIA Backend", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origin_regex=r".*",   # accept everything incl. file:// (null origin) if needed
@@ -38,10 +130,15 @@ app.add_middleware(
 )
 
 # ------------ SQLite ------------
-conn = sqlite3.connect("data.db", check_same_thread=False)
-conn.row_factory = sqlite3.Row
-
-def init_db():
+DB_PATH        = os.getenv("DB_PATH", "data.db")
+SCHEMA_VERSION = 2   # bump whenever init_db gains a table or migration
+
+def init_db(conn: sqlite3.Connection):
+    # PRAGMA user_version is stamped after a successful run, so restarts on an
+    # up-to-date DB skip the DDL and migration attempts entirely.
+    stored_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if stored_version >= SCHEMA_VERSION:
+        return
     cur = conn.cursor()
     cur.executescript("""
     CREATE TABLE IF NOT EXISTS users (
@@ -79,6 +176,17 @@ def init_db():
       created_at TEXT DEFAULT (datetime('now')),
       FOREIGN KEY (session_id) REFERENCES sessions(id)
     );
+
+    -- hourly alert counts per (type, session mode, match source); kept in step
+    -- with alerts by insert_alert so stats never scan alerts or parse payloads
+    CREATE TABLE IF NOT EXISTS alert_rollups (
+      hour TEXT,            -- 'YYYY-MM-DD HH:00' (UTC, same clock as created_at)
+      type TEXT,
+      mode TEXT,
+      source TEXT,          -- payload 'matched': keyword | moderation | heuristic | model
+      count INTEGER NOT NULL DEFAULT 0,
+      PRIMARY KEY (hour, type, mode, source)
+    );
     """)
     # gentle, idempotent migrations for existing DBs
     try: conn.execute("ALTER TABLE users ADD COLUMN user_summary TEXT DEFAULT ''")
@@ -88,9 +196,55 @@ def init_db():
     try: conn.execute("ALTER TABLE sessions ADD COLUMN tone TEXT DEFAULT 'professional'")
     except Exception: pass
 
+    if stored_version < 2:
+        rebuild_alert_rollups(conn)
+
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     conn.commit()
 
-init_db()
+def rebuild_alert_rollups(conn: sqlite3.Connection) -> int:
+    """Recompute alert_rollups from alerts; the caller owns the transaction. Returns the bucket count."""
+    # aggregated inside SQLite so a write lock is held only for one statement.
+    # cycle-negative alerts written before "matched" was recorded all came from
+    # the local heuristic (USE_MODEL_TONE was hard-coded off).
+    conn.execute("DELETE FROM alert_rollups")
+    cur = conn.execute("""
+        INSERT INTO alert_rollups (hour, type, mode, source, count)
+        SELECT strftime('%Y-%m-%d %H:00', a.created_at), a.type, COALESCE(s.mode, 'unknown'),
+               COALESCE(
+                 NULLIF(CASE WHEN json_valid(a.payload) THEN
+                          CASE WHEN json_type(a.payload) = 'object'
+                               THEN json_extract(a.payload, '$.matched') END END, ''),
+                 CASE WHEN a.type = 'cycle-negative' THEN 'heuristic' ELSE 'unknown' END
+               ),
+               COUNT(*)
+        FROM alerts a LEFT JOIN sessions s ON s.id = a.session_id
+        GROUP BY 1, 2, 3, 4
+    """)
+    return cur.rowcount
+
+def repair_alert_rollups() -> int:
+    # dedicated connection + BEGIN IMMEDIATE so concurrent insert_alert calls on
+    # the shared connection wait for the rebuild instead of interleaving with it
+    get_conn()   # make sure the schema exists
+    c = sqlite3.connect(DB_PATH, isolation_level=None)
+    c.row_factory = sqlite3.Row
+    try:
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            n = rebuild_alert_rollups(c)
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+        return n
+    finally:
+        c.close()
+
+def _alert_source(type_: str, payload) -> str:
+    # mirrors the source expression in rebuild_alert_rollups
+    matched = payload.get("matched") if isinstance(payload, dict) else None
+    return matched or ("heuristic" if type_ == "cycle-negative" else "unknown")
 
 # ------------ Models ------------
 class UserCreate(BaseModel):
@@ -110,12 +264,12 @@ class ToneUpdate(BaseModel):
     tone: Literal["professional","casual"]
 
 def get_session_tone(session_id: str) -> str:
-    row = conn.execute("SELECT tone FROM sessions WHERE id=?", (session_id,)).fetchone()
+    row = get_conn().execute("SELECT tone FROM sessions WHERE id=?", (session_id,)).fetchone()
     return (row["tone"] if row and row["tone"] else "professional")
 
 def set_session_tone(session_id: str, tone: str):
-    conn.execute("UPDATE sessions SET tone=? WHERE id=?", (tone, session_id))
-    conn.commit()
+    get_conn().execute("UPDATE sessions SET tone=? WHERE id=?", (tone, session_id))
+    get_conn().commit()
 
 @app.post("/api/session/{session_id}/tone")
 def update_tone(session_id: str, body: ToneUpdate):
@@ -163,29 +317,29 @@ Repeat for 3 exchanges (Self → Monster) × 3. After that, I (Lumen) will respo
 """
 
 CRISIS_PATTERNS = [
-    re.compile(r"kill myself", re.I),
-    re.compile(r"suicide", re.I),
-    re.compile(r"end my life", re.I),
-    re.compile(r"want to die", re.I),
-    re.compile(r"don'?t want to live", re.I),
-    re.compile(r"hurt myself", re.I),
-    re.compile(r"self[-\s]?harm", re.I),
-    re.compile(r"cutting myself", re.I),
-    re.compile(r"overdose", re.I),
-    re.compile(r"jump off", re.I),
+    r"kill myself",
+    r"suicide",
+    r"end my life",
+    r"want to die",
+    r"don'?t want to live",
+    r"hurt myself",
+    r"self[-\s]?harm",
+    r"cutting myself",
+    r"overdose",
+    r"jump off",
 ]
 
 NEGATIVE_HINTS = [
-    re.compile(r"\bi can'?t\b", re.I),
-    re.compile(r"\bi won'?t\b", re.I),
-    re.compile(r"\bnever\b", re.I),
-    re.compile(r"\bhopeless\b", re.I),
-    re.compile(r"\bworthless\b", re.I),
-    re.compile(r"\bfail(ed|ing)?\b", re.I),
-    re.compile(r"pointless|no point", re.I),
-    re.compile(r"stupid|useless", re.I),
-    re.compile(r"always mess", re.I),
-    re.compile(r"nothing works", re.I),
+    r"\bi can'?t\b",
+    r"\bi won'?t\b",
+    r"\bnever\b",
+    r"\bhopeless\b",
+    r"\bworthless\b",
+    r"\bfail(ed|ing)?\b",
+    r"pointless|no point",
+    r"stupid|useless",
+    r"always mess",
+    r"nothing works",
 ]
 
 USE_MODEL_TONE = False
@@ -195,11 +349,20 @@ ALWAYS_INCLUDE_SESSION_SUMMARY = False
 ALWAYS_INCLUDE_USER_SUMMARY    = False
 MIN_OVERLAP                    = 2
 
+# patterns stay plain strings; each list is compiled into one alternation on first use
+@lru_cache(maxsize=None)
+def _crisis_rx() -> re.Pattern:
+    return re.compile("|".join(f"(?:{p})" for p in CRISIS_PATTERNS), re.I)
+
+@lru_cache(maxsize=None)
+def _negative_rx() -> re.Pattern:
+    return re.compile("|".join(f"(?:{p})" for p in NEGATIVE_HINTS), re.I)
+
 def check_crisis_local(text: str) -> bool:
-    return any(rx.search(text) for rx in CRISIS_PATTERNS)
+    return _crisis_rx().search(text) is not None
 
 def looks_negative_local(text: str) -> bool:
-    return any(rx.search(text) for rx in NEGATIVE_HINTS)
+    return _negative_rx().search(text) is not None
 
 # ------------ Memory relevance ------------
 _STOP = set(("a an and are as at be but by for from has have i if in into is it its of on or so that the their them there they this to was we what when where which who why will with you your".split()))
@@ -213,7 +376,7 @@ def is_connected_to_summary(current_text: str, summary_text: str, min_overlap: i
     return len(_kw(current_text) & _kw(summary_text)) >= min_overlap
 
 def get_current_cycle(session_id: str):
-    cur = conn.cursor()
+    cur = get_conn().cursor()
     cur.execute("""
         SELECT role, text FROM messages
         WHERE session_id = ?
@@ -266,14 +429,15 @@ def build_therapist_prompt(history: List[dict]) -> str:
     )
 
 # ---- Negativity classifier (model-backed; falls back to heuristic) ----
-def classify_negatives_with_model(texts: List[str]) -> List[bool]:
+def classify_negatives_with_model(texts: List[str]) -> tuple:
+    """Returns (labels, source); source is "heuristic" when the model call fell back."""
     prompt = (
         'Return JSON only: {"labels":[booleans matching each input as negative or not]}.\n'
         'Mark "negative" when there is self-judgment, hopelessness about self, global negative self-evaluation, or strongly pessimistic outlook.\n\n'
         + "\n".join([f"#{i+1}: {json.dumps(t)}" for i, t in enumerate(texts)])
     )
     try:
-        resp = client.chat.completions.create(
+        resp = get_client().chat.completions.create(
             model=TONE_MODEL,
             temperature=0,
             messages=[
@@ -285,10 +449,10 @@ def classify_negatives_with_model(texts: List[str]) -> List[bool]:
         data = json.loads(out)
         labels = data.get("labels")
         if isinstance(labels, list) and len(labels) == len(texts):
-            return [bool(x) for x in labels]
+            return [bool(x) for x in labels], "model"
     except Exception:
         pass
-    return [looks_negative_local(t) for t in texts]
+    return [looks_negative_local(t) for t in texts], "heuristic"
 
 # ---- Mid-cycle SELF suggestions (Two Chairs) ----
 def _truncate(s: str, limit: int) -> str:
@@ -330,7 +494,7 @@ Rules:
 - No clinical claims. No toxic positivity. No questions.
 """
     try:
-        resp = client.chat.completions.create(
+        resp = get_client().chat.completions.create(
             model=REPLY_MODEL,
             temperature=0.2,
             messages=[
@@ -353,72 +517,155 @@ Rules:
 # ------------ DB Helpers ------------
 def insert_user(display_name: Optional[str], trusted_contact: Optional[str]) -> str:
     uid = uuid.uuid4().hex
-    conn.execute(
+    get_conn().execute(
         "INSERT INTO users (id, display_name, trusted_contact) VALUES (?,?,?)",
         (uid, display_name, trusted_contact),
     )
-    conn.commit()
+    get_conn().commit()
     return uid
 
 def insert_session(user_id: Optional[str], mode: str) -> str:
     sid = uuid.uuid4().hex
-    conn.execute(
+    get_conn().execute(
         "INSERT INTO sessions (id, user_id, mode) VALUES (?,?,?)",
         (sid, user_id, mode),
     )
-    conn.commit()
+    get_conn().commit()
     return sid
 
 def insert_message(session_id: str, role: str, text: str):
-    conn.execute(
+    get_conn().execute(
         "INSERT INTO messages (session_id, role, text) VALUES (?,?,?)",
         (session_id, role, text),
     )
-    conn.commit()
+    get_conn().commit()
 
 def insert_alert(session_id: str, type_: str, payload: dict):
-    conn.execute(
+    cur = get_conn().execute(
         "INSERT INTO alerts (session_id, type, payload) VALUES (?,?,?)",
         (session_id, type_, json.dumps(payload)),
     )
-    conn.commit()
+    # same transaction: bump the hourly rollup bucket for this alert
+    get_conn().execute("""
+        INSERT INTO alert_rollups (hour, type, mode, source, count)
+        SELECT strftime('%Y-%m-%d %H:00', a.created_at), a.type, COALESCE(s.mode, 'unknown'), ?, 1
+        FROM alerts a LEFT JOIN sessions s ON s.id = a.session_id
+        WHERE a.id = ?
+        ON CONFLICT (hour, type, mode, source) DO UPDATE SET count = count + 1
+    """, (_alert_source(type_, payload), cur.lastrowid))
+    get_conn().commit()
+
+# ------------ Alert analytics (reads alert_rollups only) ------------
+MAX_STATS_HOURS = 24 * 90
+
+def get_alert_stats(hours: int) -> dict:
+    since = get_conn().execute(
+        "SELECT strftime('%Y-%m-%d %H:00', 'now', ?)", (f"-{hours - 1} hours",)
+    ).fetchone()[0]
+    rows = get_conn().execute(
+        "SELECT hour, type, mode, source, count FROM alert_rollups WHERE hour >= ? ORDER BY hour ASC",
+        (since,),
+    ).fetchall()
+
+    by_type, by_mode, by_source, hourly = Counter(), Counter(), Counter(), {}
+    for r in rows:
+        by_type[r["type"]] += r["count"]
+        by_mode[r["mode"]] += r["count"]
+        by_source[r["source"]] += r["count"]
+        bucket = hourly.setdefault(r["hour"], {"hour": r["hour"], "total": 0})
+        bucket[r["type"]] = bucket.get(r["type"], 0) + r["count"]
+        bucket["total"] += r["count"]
+
+    all_time = get_conn().execute(
+        "SELECT type, SUM(count) AS n FROM alert_rollups GROUP BY type"
+    ).fetchall()
+    return {
+        "windowHours": hours,
+        "since": since,
+        "total": sum(by_type.values()),
+        "byType": dict(by_type),
+        "byMode": dict(by_mode),
+        "bySource": dict(by_source),
+        "hourly": list(hourly.values()),
+        "allTime": {r["type"]: r["n"] for r in all_time},
+    }
 
 # ------------ Summary (SQLite) ------------
 def get_sql_summary(session_id: str) -> str:
-    row = conn.execute("SELECT summary FROM sessions WHERE id=?", (session_id,)).fetchone()
+    row = get_conn().execute("SELECT summary FROM sessions WHERE id=?", (session_id,)).fetchone()
     return row["summary"] if row and row["summary"] else ""
 
 def set_sql_summary(session_id: str, text: str):
-    conn.execute("UPDATE sessions SET summary=? WHERE id=?", (text, session_id))
-    conn.commit()
+    get_conn().execute("UPDATE sessions SET summary=? WHERE id=?", (text, session_id))
+    get_conn().commit()
 
 # --- Cross-session (user-level) summary helpers ---
 def get_user_id_for_session(session_id: str) -> Optional[str]:
-    row = conn.execute("SELECT user_id FROM sessions WHERE id=?", (session_id,)).fetchone()
+    row = get_conn().execute("SELECT user_id FROM sessions WHERE id=?", (session_id,)).fetchone()
     return row["user_id"] if row and row["user_id"] else None
 
 def get_user_summary(user_id: str) -> str:
-    row = conn.execute("SELECT user_summary FROM users WHERE id=?", (user_id,)).fetchone()
+    row = get_conn().execute("SELECT user_summary FROM users WHERE id=?", (user_id,)).fetchone()
     return row["user_summary"] if row and row["user_summary"] else ""
 
 def set_user_summary(user_id: str, text: str):
-    conn.execute("UPDATE users SET user_summary=? WHERE id=?", (text, user_id))
-    conn.commit()
+    get_conn().execute("UPDATE users SET user_summary=? WHERE id=?", (text, user_id))
+    get_conn().commit()
 
 # --- Session status ---
 def get_session_status(session_id: str) -> Optional[str]:
-    row = conn.execute("SELECT status FROM sessions WHERE id=?", (session_id,)).fetchone()
+    row = get_conn().execute("SELECT status FROM sessions WHERE id=?", (session_id,)).fetchone()
     return row["status"] if row else None
 
 def set_session_status(session_id: str, status: str):
-    conn.execute("UPDATE sessions SET status=? WHERE id=?", (status, session_id))
-    conn.commit()
+    get_conn().execute("UPDATE sessions SET status=? WHERE id=?", (status, session_id))
+    get_conn().commit()
 
 # ------------ Routes ------------
 @app.get("/api/health")
 def health():
     return {"ok": True, "time": datetime.utcnow().isoformat()}
 
+@app.get("/api/ready")
+def ready():
+    # liveness stays /api/health; this one gates traffic until every lazy
+    # component exists, retrying the warm-up in the background if one is missing
+    checks = {
+        "database": _conn is not None,
+        "assets": _assets is not None,
+        "openaiClient": _client is not None,
+    }
+    body = {
+        "ready": all(checks.values()),
+        "checks": checks,
+        "schemaVersion": SCHEMA_VERSION,
+        "warmupSeconds": _warmup["seconds"],
+        "uptimeSeconds": round(time.monotonic() - STARTED_AT, 3),
+    }
+    if not body["ready"]:
+        start_warm_up()
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="admin endpoints are disabled (ADMIN_TOKEN not set)")
+    auth = request.headers.get("authorization", "")
+    if not hmac.compare_digest(auth.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="invalid admin token")
+
+@app.get("/api/admin/alerts/stats")
+def alert_stats(request: Request, hours: int = 24 * 7):
+    require_admin(request)
+    if not 1 <= hours <= MAX_STATS_HOURS:
+        raise HTTPException(status_code=400, detail=f"hours must be between 1 and {MAX_STATS_HOURS}")
+    return JSONResponse(content=get_alert_stats(hours), headers={"Cache-Control": "no-store"})
+
+@app.post("/api/admin/alerts/rollups/rebuild")
+def alert_rollups_rebuild(request: Request):
+    require_admin(request)
+    return {"ok": True, "buckets": repair_alert_rollups()}
+
 @app.post("/api/user")
 def create_user(body: UserCreate):
     uid = insert_user(body.displayName, body.trustedContact)
@@ -432,7 +679,7 @@ def create_session(body: SessionCreate):
 
 @app.get("/api/session/{session_id}/messages")
 def get_messages(session_id: str):
-    cur = conn.cursor()
+    cur = get_conn().cursor()
     cur.execute(
         "SELECT id, role, text, created_at FROM messages WHERE session_id=? ORDER BY id ASC",
         (session_id,),
@@ -475,7 +722,7 @@ def post_message(body: MessageCreate):
 
     # moderation API (OpenAI)
     try:
-        mod = client.moderations.create(model=MOD_MODEL, input=text)
+        mod = get_client().moderations.create(model=MOD_MODEL, input=text)
         flagged = False
         try:
             flagged = bool(mod.results[0].categories.self_harm)
@@ -500,25 +747,29 @@ def post_message(body: MessageCreate):
     insert_message(body.sessionId, body.role, text)
 
     # session mode
-    mode_row = conn.execute("SELECT mode FROM sessions WHERE id=?", (body.sessionId,)).fetchone()
+    mode_row = get_conn().execute("SELECT mode FROM sessions WHERE id=?", (body.sessionId,)).fetchone()
     mode = (mode_row["mode"] if mode_row and mode_row["mode"] else "two-chairs")
 
     # ---------------- THERAPIST ROOM: immediate reply ----------------
     if mode != "two-chairs":
         # full history for prompt + negativity check
-        cur = conn.cursor()
+        cur = get_conn().cursor()
         cur.execute("SELECT role, text FROM messages WHERE session_id=? ORDER BY id ASC", (body.sessionId,))
         history = [{"role": r["role"], "text": r["text"]} for r in cur.fetchall()]
 
         # quick negativity over last 3 SELF turns
         last_three_self = [h["text"] for h in history if h["role"] == "self"][-3:]
+        tone_source = "heuristic"
         if USE_MODEL_TONE and len(last_three_self) == 3:
-            self_labels = classify_negatives_with_model(last_three_self)
+            self_labels, tone_source = classify_negatives_with_model(last_three_self)
         else:
             self_labels = [looks_negative_local(t) for t in last_three_self] if len(last_three_self) == 3 else []
         safety = None
         if len(self_labels) == 3 and all(self_labels):
-            insert_alert(body.sessionId, "cycle-negative", {"selfNegatives": self_labels, "mode": "therapist-room"})
+            insert_alert(body.sessionId, "cycle-negative", {
+                "selfNegatives": self_labels, "mode": "therapist-room",
+                "matched": tone_source,
+            })
             safety = {
                 "showSafetyPopup": True,
                 "message": "Would you like extra support?",
@@ -561,7 +812,7 @@ def post_message(body: MessageCreate):
 
         tone = get_session_tone(body.sessionId)
 
-        ai = client.chat.completions.create(
+        ai = get_client().chat.completions.create(
             model=REPLY_MODEL,
             temperature=0.3,
             messages=[
@@ -575,7 +826,7 @@ def post_message(body: MessageCreate):
 
         # rolling session summary (best-effort)
         try:
-            cur = conn.cursor()
+            cur = get_conn().cursor()
             cur.execute(
                 "SELECT role, text FROM messages WHERE session_id=? ORDER BY id ASC",
                 (body.sessionId,)
@@ -590,7 +841,7 @@ def post_message(body: MessageCreate):
                 + "\n".join([f"{h['role'].upper()}: {h['text']}" for h in history])
             )
 
-            sum_resp = client.chat.completions.create(
+            sum_resp = get_client().chat.completions.create(
                 model=REPLY_MODEL,
                 temperature=0.2,
                 messages=[{"role": "user", "content": sum_prompt}]
@@ -627,8 +878,9 @@ def post_message(body: MessageCreate):
         return payload
 
     # tone for safety popup after full cycle
+    tone_source = "heuristic"
     if USE_MODEL_TONE:
-        self_labels = classify_negatives_with_model(selfs)
+        self_labels, tone_source = classify_negatives_with_model(selfs)
     else:
         self_labels = [looks_negative_local(t) for t in selfs]
 
@@ -653,7 +905,7 @@ def post_message(body: MessageCreate):
     composed = "\n\n".join(parts)
 
     # final Lumen reply after 6 messages
-    ai = client.chat.completions.create(
+    ai = get_client().chat.completions.create(
         model=REPLY_MODEL,
         temperature=0.3,
         messages=[
@@ -666,7 +918,7 @@ def post_message(body: MessageCreate):
 
     # update rolling session summary (best-effort)
     try:
-        cur = conn.cursor()
+        cur = get_conn().cursor()
         cur.execute("SELECT role, text FROM messages WHERE session_id=? ORDER BY id ASC", (body.sessionId,))
         history = [{"role": r["role"], "text": r["text"]} for r in cur.fetchall()]
         sum_prompt = (
@@ -677,7 +929,7 @@ def post_message(body: MessageCreate):
             + "\n".join([f"{h['role'].upper()}: {h['text']}" for h in history])
         )
 
-        sum_resp = client.chat.completions.create(
+        sum_resp = get_client().chat.completions.create(
             model=REPLY_MODEL,
             temperature=0.2,
             messages=[{"role": "user", "content": sum_prompt}]
@@ -692,7 +944,10 @@ def post_message(body: MessageCreate):
     all_three_negative = (len(self_labels) == 3 and all(bool(x) for x in self_labels))
     safety = None
     if all_three_negative:
-        insert_alert(body.sessionId, "cycle-negative", {"selfNegatives": self_labels})
+        insert_alert(body.sessionId, "cycle-negative", {
+            "selfNegatives": self_labels,
+            "matched": tone_source,
+        })
         safety = {
             "showSafetyPopup": True,
             "message": "Would you like to switch to the 1-on-1 Therapist Room?",
@@ -708,8 +963,195 @@ def post_message(body: MessageCreate):
         "next": {"askToContinue": True}
     }
 
-# ------------ Static mount (serve /public) ------------
-app.mount("/", StaticFiles(directory="public", html=True), name="public")
+# ------------ Static assets (serve /public) ------------
+# Every file under public/ is read once, fingerprinted (name.<hash>.ext) and
+# precompressed. HTML pages are rewritten to point at the fingerprinted URLs,
+# which are served with a one-year immutable Cache-Control; the HTML itself
+# stays revalidated via ETag so a deploy is picked up on the next load.
+PUBLIC_DIR         = "public"
+RESIZABLE_EXTS     = {".jpg", ".jpeg", ".png"}
+IMAGE_WIDTHS       = (40, 80, 120, 240)   # 1x/2x/3x for the 40px avatar, plus one spare
+MIN_COMPRESS_BYTES = 512
+IMMUTABLE_CACHE    = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE   = "no-cache"
+
+mimetypes.add_type("image/webp", ".webp")
+
+_REF_RX = re.compile(r'(?P<attr>\b(?:src|href))="(?P<ref>[^"#?:]+)"')
+_IMG_RX = re.compile(r"<img\b[^>]*>", re.I)
+
+def _fingerprint(name: str, body: bytes) -> str:
+    stem, ext = posixpath.splitext(name)
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:10]}{ext}"
+
+def _make_asset(body: bytes, ctype: str, immutable: bool) -> dict:
+    asset = {
+        "body": body,
+        "type": ctype,
+        "etag": hashlib.sha256(body).hexdigest()[:16],
+        "cache": IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE,
+        "encoded": {},   # content-coding -> bytes, only kept when smaller
+        "webp": None,    # alternate asset served to clients that accept image/webp
+    }
+    if len(body) >= MIN_COMPRESS_BYTES and (ctype.startswith("text/") or ctype in (
+            "application/javascript", "application/json", "image/svg+xml")):
+        if brotli is not None:
+            br = brotli.compress(body, quality=11)
+            if len(br) < len(body):
+                asset["encoded"]["br"] = br
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gz) < len(body):
+            asset["encoded"]["gzip"] = gz
+    return asset
+
+def _image_renditions(body: bytes) -> tuple:
+    """Decode once; return (full-size WebP or None, [(width, jpeg, webp), ...]). Empty without Pillow."""
+    if Image is None:
+        return None, []
+    out = []
+    try:
+        with Image.open(io.BytesIO(body)) as src:
+            src = src.convert("RGB")
+            full = io.BytesIO()
+            src.save(full, "WEBP", quality=80, method=6)
+            for w in IMAGE_WIDTHS:
+                if w >= src.width:
+                    break
+                img = src.resize((w, round(src.height * w / src.width)), Image.LANCZOS)
+                jpg, webp = io.BytesIO(), io.BytesIO()
+                img.save(jpg, "JPEG", quality=82, optimize=True, progressive=True)
+                img.save(webp, "WEBP", quality=80, method=6)
+                out.append((w, jpg.getvalue(), webp.getvalue()))
+    except Exception:
+        return None, []
+    return full.getvalue(), out
+
+def build_asset_table(root: str = PUBLIC_DIR) -> dict:
+    """Read public/ into memory: {url path: asset}. HTML is rewritten to fingerprinted URLs."""
+    table, manifest, srcsets, pages = {}, {}, {}, []
+    for dirpath, _, files in os.walk(root):
+        for fn in sorted(files):
+            full = os.path.join(dirpath, fn)
+            rel = os.path.relpath(full, root).replace(os.sep, "/")
+            with open(full, "rb") as f:
+                body = f.read()
+            ext = posixpath.splitext(fn)[1].lower()
+            if ext == ".html":
+                pages.append((rel, body))
+                continue
+            ctype = mimetypes.guess_type(fn)[0] or "application/octet-stream"
+            fp = _fingerprint(rel, body)
+            manifest[rel] = fp
+            table[fp] = _make_asset(body, ctype, immutable=True)
+            # same bytes and encodings under the unhashed name, just revalidated
+            table[rel] = dict(table[fp], cache=REVALIDATE_CACHE)
+
+            if ext in RESIZABLE_EXTS:
+                webp, variants = _image_renditions(body)
+                if webp and len(webp) < len(body):
+                    table[fp]["webp"] = _make_asset(webp, "image/webp", immutable=True)
+                entries = []
+                for w, jpg, webp in variants:
+                    stem = posixpath.splitext(rel)[0]
+                    vfp = _fingerprint(f"{stem}.w{w}.jpg", jpg)
+                    table[vfp] = _make_asset(jpg, "image/jpeg", immutable=True)
+                    table[vfp]["webp"] = _make_asset(webp, "image/webp", immutable=True)
+                    entries.append(f"/{vfp} {w}w")
+                if entries:
+                    srcsets[rel] = ", ".join(entries)
+
+    def rewrite(page: str, html: str) -> str:
+        base = posixpath.dirname(page)
+        def resolve(ref: str) -> Optional[str]:
+            if ref.startswith("/"):
+                return ref.lstrip("/")
+            return posixpath.normpath(posixpath.join(base, ref))
+        def sub_ref(m):
+            rel = resolve(m.group("ref"))
+            if rel in manifest:
+                return f'{m.group("attr")}="/{manifest[rel]}"'
+            return m.group(0)
+        def sub_img(m):
+            tag = m.group(0)
+            src = re.search(r'\bsrc="([^"#?:]+)"', tag)
+            rel = resolve(src.group(1)) if src else None
+            if rel in srcsets and "srcset=" not in tag:
+                tag = tag[:-1].rstrip().rstrip("/").rstrip() + f' srcset="{srcsets[rel]}">'
+            return tag
+        return _REF_RX.sub(sub_ref, _IMG_RX.sub(sub_img, html))
+
+    for rel, body in pages:
+        html = rewrite(rel, body.decode("utf-8")).encode("utf-8")
+        table[rel] = _make_asset(html, "text/html; charset=utf-8", immutable=False)
+    return table
+
+def _accepts(header: str, token: str) -> bool:
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() in (token, "*") or (token.startswith("image/") and name.strip() == "image/*"):
+            q = params.strip()
+            if q.startswith("q="):
+                try:
+                    return float(q[2:]) > 0
+                except ValueError:
+                    return False
+            return True
+    return False
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return f'"{etag}"' in tags
+
+class AssetFiles(StaticFiles):
+    """StaticFiles mount that answers from the in-memory asset table instead of disk."""
+
+    async def get_response(self, path: str, scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        key = "" if path == "." else path.replace(os.sep, "/")   # path is already normpath'd
+        if not key or scope["path"].endswith("/"):
+            key = posixpath.join(key, "index.html")
+        assets = _assets   # only a cold start pays the threadpool hop to build the table
+        if assets is None:
+            assets = await run_in_threadpool(get_assets)
+        asset = assets.get(key) or assets.get(posixpath.join(key, "index.html"))
+        if asset is None:
+            raise HTTPException(status_code=404)
+        return asset_response(asset, Request(scope))
+
+def asset_response(asset: dict, request: Request) -> Response:
+    vary = ["Accept-Encoding"]
+    if asset["webp"] is not None:
+        vary.append("Accept")
+        if _accepts(request.headers.get("accept", ""), "image/webp"):
+            asset = asset["webp"]
+
+    body, etag, headers = asset["body"], asset["etag"], {}
+    accept_enc = request.headers.get("accept-encoding", "")
+    for coding in ("br", "gzip"):
+        if coding in asset["encoded"] and _accepts(accept_enc, coding):
+            body, etag = asset["encoded"][coding], f'{etag}-{coding}'
+            headers["Content-Encoding"] = coding
+            break
+
+    headers.update({
+        "ETag": f'"{etag}"',
+        "Cache-Control": asset["cache"],
+        "Vary": ", ".join(vary),
+    })
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        return Response(status_code=200, headers=headers, media_type=asset["type"])
+    return Response(content=body, headers=headers, media_type=asset["type"])
+
+app.mount("/", AssetFiles(directory=PUBLIC_DIR, html=True), name="public")
 
 # Run locally:
 # uvicorn server:app --reload --host 0.0.0.0 --port 3000